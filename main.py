@@ -1,132 +1,228 @@
 import sys
 import os
+import queue
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import List, Optional
-import whisper
-from moviepy import VideoFileClip
+import ctranslate2
+import numpy as np
+from faster_whisper import BatchedInferencePipeline, WhisperModel, decode_audio
 from PyQt6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
     QPushButton, QLabel, QListWidget, QProgressBar, QComboBox,
-    QFileDialog, QCheckBox, QListWidgetItem, QMessageBox, QGroupBox
+    QFileDialog, QCheckBox, QListWidgetItem, QMessageBox, QGroupBox,
+    QSpinBox
 )
 from PyQt6.QtCore import Qt, QThread, pyqtSignal
 from PyQt6.QtGui import QColor
 
 
+AUDIO_EXTENSIONS = frozenset({'mp3', 'wav', 'm4a', 'flac', 'ogg'})
+VIDEO_EXTENSIONS = frozenset({'mp4', 'avi', 'mov', 'mkv', 'flv', 'wmv', 'webm', 'm4v'})
+MEDIA_EXTENSIONS = AUDIO_EXTENSIONS | VIDEO_EXTENSIONS
+
+
 class FileItem:
     def __init__(self, file_path: str):
         self.file_path = file_path
+        path = Path(file_path)
+        self.name = path.name
+        self.stem = path.stem
         self.status = "Ожидание"
         self.transcription = ""
         self.error_message = ""
 
 
+def warm_up_model(model: WhisperModel):
+    try:
+        segments, info = model.transcribe(np.zeros(16000, dtype=np.float32), beam_size=1)
+        for segment in segments:
+            pass
+    except Exception:
+        pass
+
+
+def resolve_compute_type(compute_type: str) -> str:
+    if compute_type == "auto":
+        return "float16" if ctranslate2.get_cuda_device_count() > 0 else "int8"
+    return compute_type
+
+
+class ModelLoader(QThread):
+    loaded = pyqtSignal(str, str, int, object)
+
+    def __init__(self, model_name: str, compute_type: str = "auto", cpu_threads: int = 0):
+        super().__init__()
+        self.model_name = model_name
+        self.compute_type = compute_type
+        self.cpu_threads = cpu_threads
+
+    def run(self):
+        try:
+            model = WhisperModel(self.model_name, device="auto",
+                                 compute_type=resolve_compute_type(self.compute_type),
+                                 cpu_threads=self.cpu_threads)
+            warm_up_model(model)
+            self.loaded.emit(self.model_name, self.compute_type, self.cpu_threads, model)
+        except Exception:
+            pass
+
+
 class TranscriptionWorker(QThread):
     progress_update = pyqtSignal(int, str, str)
     file_progress = pyqtSignal(int)
     finished = pyqtSignal()
 
-    def __init__(self, files: List[FileItem], model_name: str, language: Optional[str],
-                 task: str, max_workers: int = 2):
+    def __init__(self):
         super().__init__()
-        self.files = files
-        self.model_name = model_name
-        self.language = language
-        self.task = task
-        self.max_workers = max_workers
+        self.job_queue: queue.Queue = queue.Queue()
+        self.busy = False
+        self.files: List[FileItem] = []
+        self.model_name = ""
+        self.language: Optional[str] = None
+        self.task = "transcribe"
+        self.compute_type = "auto"
+        self.cpu_threads = 0
+        self.vad_filter = True
         self.model = None
-
-    def extract_audio_from_video(self, video_path: str) -> str:
-        temp_audio_path = video_path.rsplit('.', 1)[0] + '_temp_audio.wav'
+        self.pipeline: Optional[BatchedInferencePipeline] = None
+        self.error = ""
+
+    def submit(self, files: List[FileItem], model_name: str, language: Optional[str],
+               task: str, compute_type: str = "auto", cpu_threads: int = 0,
+               vad_filter: bool = True, model=None):
+        self.job_queue.put({
+            "files": files,
+            "model_name": model_name,
+            "language": language,
+            "task": task,
+            "compute_type": compute_type,
+            "cpu_threads": cpu_threads,
+            "vad_filter": vad_filter,
+            "model": model,
+        })
+
+    def prepare_audio(self, file_item: FileItem) -> np.ndarray:
         try:
-            video = VideoFileClip(video_path)
-            video.audio.write_audiofile(temp_audio_path, verbose=False, logger=None)
-            video.close()
-            return temp_audio_path
+            return decode_audio(file_item.file_path, sampling_rate=16000)
+        except IndexError:
+            raise Exception("Ошибка извлечения аудио: аудиопоток не найден")
         except Exception as e:
             raise Exception(f"Ошибка извлечения аудио: {str(e)}")
 
-    def transcribe_file(self, file_item: FileItem, index: int) -> None:
+    def transcribe_file(self, file_item: FileItem, index: int, audio: np.ndarray) -> None:
         try:
             self.progress_update.emit(index, file_item.file_path, "В процессе")
 
-            file_path = file_item.file_path
-            temp_audio_path = None
-
-            video_extensions = ['.mp4', '.avi', '.mov', '.mkv', '.flv', '.wmv', '.webm', '.m4v']
-            file_ext = Path(file_path).suffix.lower()
-
-            if file_ext in video_extensions:
-                temp_audio_path = self.extract_audio_from_video(file_path)
-                audio_path = temp_audio_path
-            else:
-                audio_path = file_path
-
-            if self.language and self.language != "auto":
-                result = self.model.transcribe(
-                    audio_path,
+            if self.vad_filter:
+                segments, info = self.pipeline.transcribe(
+                    audio,
                     task=self.task,
-                    language=self.language
+                    language=self.language,
+                    beam_size=5,
+                    vad_filter=True,
+                    batch_size=16
                 )
             else:
-                result = self.model.transcribe(
-                    audio_path,
-                    task=self.task
+                segments, info = self.model.transcribe(
+                    audio,
+                    task=self.task,
+                    language=self.language,
+                    beam_size=5
                 )
 
-            file_item.transcription = result["text"]
+            file_item.transcription = "".join(segment.text for segment in segments).strip()
             file_item.status = "Готово"
             self.progress_update.emit(index, file_item.file_path, "Готово")
 
-            if temp_audio_path and os.path.exists(temp_audio_path):
-                os.remove(temp_audio_path)
-
         except Exception as e:
             file_item.status = "Ошибка"
             file_item.error_message = str(e)
             self.progress_update.emit(index, file_item.file_path, f"Ошибка: {str(e)}")
 
-            if temp_audio_path and os.path.exists(temp_audio_path):
-                try:
-                    os.remove(temp_audio_path)
-                except:
-                    pass
-
     def run(self):
+        while True:
+            job = self.job_queue.get()
+            if job is None:
+                break
+
+            self.busy = True
+            self.error = ""
+            self.process_job(job)
+            self.busy = False
+            self.finished.emit()
+
+    def process_job(self, job: dict):
+        self.files = job["files"]
+        self.model_name = job["model_name"]
+        self.language = job["language"]
+        self.task = job["task"]
+        self.compute_type = job["compute_type"]
+        self.cpu_threads = job["cpu_threads"]
+        self.vad_filter = job["vad_filter"]
+        self.model = job["model"]
+
         try:
-            self.progress_update.emit(-1, "Загрузка Whisper...", "Загрузка")
-            self.model = whisper.load_model(self.model_name)
-            self.progress_update.emit(-1, "Модель загружена", "Готово")
+            if self.model is None:
+                self.progress_update.emit(-1, "Загрузка Whisper...", "Загрузка")
+                self.model = WhisperModel(self.model_name, device="auto",
+                                          compute_type=resolve_compute_type(self.compute_type),
+                                          cpu_threads=self.cpu_threads)
+                warm_up_model(self.model)
+                self.progress_update.emit(-1, "Модель загружена", "Готово")
+
+            self.pipeline = BatchedInferencePipeline(model=self.model)
 
             total_files = len(self.files)
-            completed = 0
+            audio_queue: queue.Queue = queue.Queue(maxsize=3)
 
-            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-                futures = {
-                    executor.submit(self.transcribe_file, file_item, idx): idx
-                    for idx, file_item in enumerate(self.files)
-                }
+            def prepare(idx: int, file_item: FileItem):
+                try:
+                    audio_queue.put((idx, file_item, self.prepare_audio(file_item)))
+                except Exception as e:
+                    file_item.status = "Ошибка"
+                    file_item.error_message = str(e)
+                    self.progress_update.emit(idx, file_item.file_path, f"Ошибка: {str(e)}")
+                    audio_queue.put((idx, file_item, None))
 
-                for future in as_completed(futures):
-                    completed += 1
-                    progress_percent = int((completed / total_files) * 100)
-                    self.file_progress.emit(progress_percent)
+            extractor_pool = ThreadPoolExecutor(max_workers=2)
+            for idx, file_item in enumerate(self.files):
+                extractor_pool.submit(prepare, idx, file_item)
 
-            self.finished.emit()
+            for completed in range(1, total_files + 1):
+                idx, file_item, audio = audio_queue.get()
+                if audio is not None:
+                    self.transcribe_file(file_item, idx, audio)
+                self.file_progress.emit(int((completed / total_files) * 100))
+
+            extractor_pool.shutdown(wait=True)
 
         except Exception as e:
+            self.error = str(e)
             self.progress_update.emit(-1, f"Ошибка: {str(e)}", "Ошибка")
-            self.finished.emit()
 
 
 class TranscriberApp(QMainWindow):
     def __init__(self):
         super().__init__()
         self.files: List[FileItem] = []
-        self.worker: Optional[TranscriptionWorker] = None
+        self._file_set: set = set()
+        self._list_items: List[QListWidgetItem] = []
+        self._model_cache: dict = {}
         self.init_ui()
 
+        self.worker = TranscriptionWorker()
+        self.worker.progress_update.connect(self.on_progress_update)
+        self.worker.file_progress.connect(self.on_file_progress)
+        self.worker.finished.connect(self.on_transcription_finished)
+        self.worker.start()
+
+        self._preloader = ModelLoader(self.model_combo.currentText(),
+                                      self.compute_type_combo.currentText(),
+                                      self.cpu_threads_spin.value())
+        self._preloader.loaded.connect(self.on_model_loaded)
+        self._preloader.start()
+
     def init_ui(self):
         self.setWindowTitle("Транскрипция Аудио/Видео")
         self.setGeometry(100, 100, 900, 700)
@@ -143,7 +239,18 @@ class TranscriberApp(QMainWindow):
         self.model_combo = QComboBox()
         self.model_combo.addItems(["tiny", "base", "small", "medium", "large"])
         self.model_combo.setCurrentText("base")
+        self.model_combo.currentTextChanged.connect(self.on_model_changed)
         model_layout.addWidget(self.model_combo)
+        model_layout.addWidget(QLabel("Тип вычислений:"))
+        self.compute_type_combo = QComboBox()
+        self.compute_type_combo.addItems(["auto", "int8", "float16", "float32"])
+        self.compute_type_combo.setCurrentText("auto")
+        model_layout.addWidget(self.compute_type_combo)
+        model_layout.addWidget(QLabel("Потоки CPU:"))
+        self.cpu_threads_spin = QSpinBox()
+        self.cpu_threads_spin.setRange(0, os.cpu_count() or 1)
+        self.cpu_threads_spin.setSpecialValueText("авто")
+        model_layout.addWidget(self.cpu_threads_spin)
         model_layout.addStretch()
         settings_layout.addLayout(model_layout)
 
@@ -161,6 +268,10 @@ class TranscriberApp(QMainWindow):
         self.translate_checkbox = QCheckBox("Перевести на русский")
         settings_layout.addWidget(self.translate_checkbox)
 
+        self.vad_checkbox = QCheckBox("Пропускать тишину (VAD)")
+        self.vad_checkbox.setChecked(True)
+        settings_layout.addWidget(self.vad_checkbox)
+
         self.recursive_checkbox = QCheckBox("Рекурсивный поиск в папках")
         settings_layout.addWidget(self.recursive_checkbox)
 
@@ -211,6 +322,15 @@ class TranscriberApp(QMainWindow):
 
         main_layout.addLayout(action_buttons_layout)
 
+    def on_model_loaded(self, model_name: str, compute_type: str, cpu_threads: int, model):
+        self._model_cache[(model_name, compute_type, cpu_threads)] = model
+
+    def on_model_changed(self, model_name: str):
+        self._model_cache = {
+            key: model for key, model in self._model_cache.items()
+            if key[0] == model_name
+        }
+
     def add_files( self):
         file_filter = " файлы (*.mp3 *.wav *.m4a *.flac *.ogg *.mp4 *.avi *.mov *.mkv *.flv *.wmv *.webm);;Все файлы (*.*)"
         files, _ = QFileDialog.getOpenFileNames(
@@ -221,7 +341,8 @@ class TranscriberApp(QMainWindow):
         )
 
         for file_path in files:
-            if not any(f.file_path == file_path for f in  self.files):
+            if file_path not in self._file_set:
+                self._file_set.add(file_path)
                 file_item = FileItem(file_path)
                 self.files.append(file_item)
                 self.update_file_list()
@@ -238,53 +359,69 @@ class TranscriberApp(QMainWindow):
             self.update_file_list ()
 
     def scan_folder( self, folder_path: str):
-        media_extensions = {
-            '.mp3', '.wav', '.m4a', '.flac', '.ogg',
-            '.mp4', '.avi', '.mov', '.mkv', '.flv', '.wmv', '.webm', '.m4v'
-        }
-
-        path = Path(folder_path)
-
-        if self.recursive_checkbox.isChecked ():
-            files = path.rglob('*')
-        else:
-            files = path.glob('*')
-
-        for file_path in files:
-            if file_path.is_file()  and file_path.suffix.lower () in  media_extensions:
-                file_path_str = str(file_path)
-                if not any(f.file_path == file_path_str for  f in self.files):
-                    file_item = FileItem(file_path_str)
-                    self.files.append(file_item)
+        recursive = self.recursive_checkbox.isChecked()
+
+        def walk(dir_path: str):
+            try:
+                entries = os.scandir(dir_path)
+            except OSError:
+                return
+            with entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        if recursive:
+                            yield from walk(entry.path)
+                    elif entry.name.rpartition('.')[2].lower() in MEDIA_EXTENSIONS:
+                        if entry.is_file():
+                            yield entry.path
+
+        for file_path in walk(folder_path):
+            if file_path not in self._file_set:
+                self._file_set.add(file_path)
+                file_item = FileItem(file_path)
+                self.files.append(file_item)
 
     def clear_list(self):
+        if self.worker.busy:
+            QMessageBox.warning(self, "В процессе", "Транскрипция уже выполняется.")
+            return
+
         self.files.clear()
+        self._file_set.clear()
+        self._list_items.clear()
         self.file_list.clear()
         self.overall_progress.setValue(0)
         self.status_label.setText("Готово")
         self.save_btn.setEnabled(False)
 
     def update_file_list(self):
-        self.file_list.clear()
-        for file_item in self.files:
-            item_text = f"{Path(file_item.file_path).name} - {file_item.status}"
-            list_item = QListWidgetItem(item_text)
-
-            if file_item.status == "Готово":
-                list_item.setForeground(QColor(0, 150, 0))
-            elif file_item.status == "В процессе":
-                list_item.setForeground(QColor(0, 100, 200))
-            elif file_item.status.startswith("Ошибка"):
-                list_item.setForeground(QColor(200, 0, 0))
-
-            self.file_list.addItem(list_item)
+        self.file_list.setUpdatesEnabled(False)
+        try:
+            self.file_list.clear()
+            self._list_items = []
+            for file_item in self.files:
+                item_text = f"{file_item.name} - {file_item.status}"
+                list_item = QListWidgetItem(item_text)
+                self.apply_status_color(list_item, file_item.status)
+                self.file_list.addItem(list_item)
+                self._list_items.append(list_item)
+        finally:
+            self.file_list.setUpdatesEnabled(True)
+
+    def apply_status_color(self, list_item: QListWidgetItem, status: str):
+        if status == "Готово":
+            list_item.setForeground(QColor(0, 150, 0))
+        elif status == "В процессе":
+            list_item.setForeground(QColor(0, 100, 200))
+        elif status.startswith("Ошибка"):
+            list_item.setForeground(QColor(200, 0, 0))
 
     def start_transcription(self):
         if not self.files:
             QMessageBox.warning(self, "Нет файлов", "Пожалуйста, добавьте файлы для транскрипции.")
             return
 
-        if self.worker and self.worker.isRunning():
+        if self.worker.busy:
             QMessageBox.warning(self, "В процессе", "Транскрипция уже выполняется.")
             return
 
@@ -304,30 +441,57 @@ class TranscriberApp(QMainWindow):
             language = None
 
         task = "translate" if self.translate_checkbox.isChecked() else "transcribe"
+        compute_type = self.compute_type_combo.currentText()
+        cpu_threads = self.cpu_threads_spin.value()
+        cached_model = self._model_cache.get((model_name, compute_type, cpu_threads))
 
-        self.worker = TranscriptionWorker(self.files, model_name, language, task)
-        self.worker.progress_update.connect(self.on_progress_update)
-        self.worker.file_progress.connect(self.on_file_progress)
-        self.worker.finished.connect(self.on_transcription_finished)
-        self.worker.start()
+        self.worker.submit(self.files, model_name, language, task, compute_type,
+                           cpu_threads=cpu_threads,
+                           vad_filter=self.vad_checkbox.isChecked(), model=cached_model)
 
     def on_progress_update(self, index: int, file_path: str, status: str):
         if index == -1:
             self.status_label.setText(status)
         else:
-            self.files[index].status = status
-            self.update_file_list()
+            if index >= len(self._list_items):
+                return
+
+            file_item = self.files[index]
+            file_item.status = status
+
+            list_item = self._list_items[index]
+            list_item.setText(f"{file_item.name} - {status}")
+            self.apply_status_color(list_item, status)
 
     def on_file_progress(self, progress: int):
         self.overall_progress.setValue(progress)
 
     def on_transcription_finished(self):
         self.start_btn.setEnabled(True)
+
+        if self.worker.model is not None:
+            self._model_cache[(self.worker.model_name, self.worker.compute_type,
+                               self.worker.cpu_threads)] = self.worker.model
+
+        if self.worker.error:
+            self.status_label.setText(f"Ошибка: {self.worker.error}")
+            QMessageBox.critical(
+                self,
+                "Ошибка",
+                f"Транскрипция не выполнена:\n{self.worker.error}"
+            )
+            return
+
         self.save_btn.setEnabled(True)
         self.status_label.setText("Транскрипция завершена!")
 
-        done_count = sum(1 for f in self.files if f.status == "Готово")
-        error_count = sum(1 for f in self.files if f.status.startswith("Ошибка"))
+        done_count = 0
+        error_count = 0
+        for file_item in self.files:
+            if file_item.status == "Готово":
+                done_count += 1
+            elif file_item.status.startswith("Ошибка"):
+                error_count += 1
 
         QMessageBox.information(
             self,
@@ -335,6 +499,11 @@ class TranscriberApp(QMainWindow):
             f"Транскрипция  завершена!\n\nУспешно: {done_count}\nОшибок: {error_count}"
         )
 
+    def closeEvent(self, event):
+        self.worker.job_queue.put(None)
+        self.worker.wait(2000)
+        event.accept()
+
     def save_transcriptions(self):
         save_dir = QFileDialog.getExistingDirectory(
             self,
@@ -345,26 +514,37 @@ class TranscriberApp(QMainWindow):
         if not save_dir:  #if otmena
             return
 
+        ready_items = [f for f in self.files if f.status == "Готово" and f.transcription]
+
+        used_paths = set()
+        jobs = []
+        for file_item in ready_items:
+            output_path = Path(save_dir) / f"{file_item.stem}_transcription.txt"
+            n = 2
+            while output_path in used_paths:
+                output_path = Path(save_dir) / f"{file_item.stem}_transcription_{n}.txt"
+                n += 1
+            used_paths.add(output_path)
+            jobs.append((file_item, output_path))
+
+        def write_item(file_item: FileItem, output_path: Path):
+            with open(output_path, 'w', encoding='utf-8') as f:
+                f.write(file_item.transcription)
+
         saved_count = 0
         error_count = 0
         error_messages = []
 
-        for file_item in self.files:
-            if file_item.status == "Готово" and file_item.transcription:
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            futures = {executor.submit(write_item, f, p): f for f, p in jobs}
+            for future, file_item in futures.items():
                 try:
-                    original_name = Path(file_item.file_path).stem
-                    output_path = Path(save_dir) / f"{original_name}_transcription.txt"
-
-                    with open(output_path, 'w', encoding='utf-8') as f:
-                        f.write(file_item.transcription)
-
+                    future.result()
                     saved_count += 1
                 except Exception as e:
                     error_count += 1
                     error_messages.append(f"Ошибка сохранения {file_item.file_path}: {e}")
 
-
-
         QMessageBox.information(
             self,
             "Сохранение завершено",